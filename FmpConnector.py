@@ -1,9 +1,497 @@
+import array
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
 import pandas as pd
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+log=logging.getLogger(__name__)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp=None
+
+try:
+    import orjson
+except ImportError:
+    orjson=None
+
+try:
+    import ijson
+except ImportError:
+    ijson=None
+
+
+BASE_URL='https://financialmodelingprep.com/api'
+
+# endpoint templates formatted with symbol, period and limit, kinds with options map option to template,
+# financial_data options hold (statement, statement as reported), market_news options hold (all news, news for symbol)
+ENDPOINT_TEMPLATES={'company_info':{'company_profile':'/v3/profile/{symbol}',
+                                    'company_rating':'/v3/rating/{symbol}',
+                                    'historical_rating':'/v3/historical-rating/{symbol}?limit={limit}',
+                                    'recommendations':'/v3/analyst-stock-recommendations/{symbol}?limit={limit}'},
+                    'financial_data':{'balance_statement':('/v3/balance-sheet-statement/{symbol}?period={period}&limit={limit}',
+                                                           '/v3/balance-sheet-statement-as-reported/{symbol}?period={period}&limit={limit}'),
+                                      'income_statement':('/v3/income-statement/{symbol}?period={period}&limit={limit}',
+                                                          '/v3/income-statement-as-reported/{symbol}?period={period}&limit={limit}'),
+                                      'cashflow_statement':('/v3/cash-flow-statement/{symbol}?period={period}&limit={limit}',
+                                                            '/v3/cash-flow-statement-as-reported/{symbol}?period={period}&limit={limit}'),
+                                      'full_statement':('/v3/financial-statement-full-as-reported/{symbol}?period={period}&limit={limit}',)},
+                    'instruments':{'forex':'/v3/symbol/available-forex-currency-pairs',
+                                   'stock':'/v3/stock/list',
+                                   'commodities':'/v3/symbol/available-commodities',
+                                   'crypto':'/v3/symbol/available-cryptocurrencies'},
+                    'market_news':{'stock':('/v3/stock_news?limit={limit}',
+                                            '/v3/stock_news?tickers={symbol}&limit={limit}'),
+                                   'forex':('/v4/forex_news?limit={limit}',
+                                            '/v4/forex_news?symbol={symbol}&limit={limit}'),
+                                   'crypto':('/v4/crypto_news?limit={limit}',
+                                             '/v4/crypto_news?symbol={symbol}&limit={limit}')},
+                    'daily_prices':'/v3/historical-price-full/{symbol}',
+                    'sentiment':'/v4/historical/social-sentiment?symbol={symbol}&limit={limit}'}
+
+# retry policy for transient errors, delay before n-th retry is RETRY_BACKOFF*2**(n-1) seconds unless
+# api sends Retry-After header
+RETRY_TOTAL=5
+RETRY_BACKOFF=0.5
+RETRY_STATUSES=[429,500,502,503,504]
+
+OPTION_NAMES={'company_info':'info_type',
+              'financial_data':'report_type',
+              'instruments':'asset_type',
+              'market_news':'market_type'}
+
+
+class FmpError(Exception):
+    
+    '''
+    Raised when request to api fails - connection error, timeout or error status left after retries
+    '''
+
+
+def _request_error(message):
+    
+    '''
+    Log given message of failed request and return FmpError to be raised
+    '''
+    
+    log.error('%s', message)
+    
+    return FmpError(message)
+
+
+def _build_url(kind, option=None, symbol=None, period='annual', limit=10, as_reported=False):
+    
+    '''
+    Return endpoint url for given kind of data, shared by FmpConnector and FmpAsyncConnector.
+    For kinds with options {company_info, financial_data, instruments, market_news} log possible
+    options and return None if option is not valid
+    '''
+    
+    template=ENDPOINT_TEMPLATES[kind]
+    if kind in OPTION_NAMES:
+        if option not in template:
+            log.error("'%s' is not valid %s - choose info type from possible options [%s]", option, OPTION_NAMES[kind], ', '.join(template))
+            return None
+        
+        template=template[option]
+        if kind=='financial_data':
+            template=template[1] if (as_reported==True) & (option!='full_statement') else template[0]
+        elif kind=='market_news':
+            template=template[1] if symbol!=None else template[0]
+    
+    return BASE_URL+template.format(symbol=symbol, period=period, limit=limit)
+
+
+def _retry_delay(retry_after, attempt, backoff=RETRY_BACKOFF):
+    
+    '''
+    Return seconds to wait before next retry, Retry-After header in seconds takes precedence over backoff
+    '''
+    
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return backoff*2**attempt
+
+
+def _decode_json(content):
+    
+    '''
+    Return decoded json response body, orjson is used when available as it is several times faster
+    than json module on large number-heavy payloads (historical prices, full statements)
+    '''
+    
+    if orjson is not None:
+        return orjson.loads(content)
+    
+    return json.loads(content)
+
+
+def _records_df(data, columns=None):
+    
+    '''
+    Return dataframe built from list of records returned by api, log response if it can not be converted.
+    Dataframe is built column-wise from lists of values which avoids per-record work of DataFrame.from_dict.
+    If columns are given, only those present in records are built
+    '''
+    
+    if not isinstance(data, list):
+        if data is not None:
+            log.warning('unexpected response: %s', data)
+        return pd.DataFrame()
+    
+    # union of keys keeps columns present only in some records, in order of first appearance
+    keys=dict.fromkeys(key for record in data for key in record)
+    if columns is not None:
+        keys=[key for key in columns if key in keys]
+    
+    return pd.DataFrame({key:[record.get(key) for record in data] for key in keys})
+
+
+def _company_info_df(data, info_type):
+    
+    if info_type in ['historical_rating', 'recommendations']:
+        return _records_df(data)
+    
+    if (not isinstance(data, list)) or (len(data)==0):
+        if data is not None:
+            log.warning('unexpected response: %s', data)
+        return pd.DataFrame()
+    
+    # api returns one-element list, build single column frame directly instead of transposing
+    record=data[0]
+    
+    return pd.DataFrame({'info':list(record.values())}, index=pd.Index(list(record.keys()), name='field'))
+
+
+def _financial_data_df(data, report_type=None, columns=None):
+    
+    if report_type=='full_statement':
+        return _statement_df(data, columns)
+    
+    df=_records_df(data, columns)
+    df=df.rename(columns={0:'info'})
+    
+    return df
+
+
+def _statement_df(data, columns=None):
+    
+    '''
+    Return dataframe for full statement records. Column dtype is declared from first non-null value of the
+    column (numbers as float64, other values as object), the same way as in _stream_columns, and values are
+    written into preallocated arrays in single pass. Columns with integer values only are returned as int64.
+    If columns are given, other keys are skipped
+    '''
+    
+    if (not isinstance(data, list)) or (len(data)==0):
+        return _records_df(data, columns)
+    
+    wanted=None if columns is None else set(columns)
+    
+    rows=len(data)
+    # None marks column with only null values so far, its dtype is not declared yet
+    buffers={}
+    integer={}
+    for row, record in enumerate(data):
+        for key, value in record.items():
+            buffer=buffers.get(key)
+            if buffer is None:
+                if (wanted is not None) and (key not in wanted):
+                    continue
+                if value is None:
+                    buffers[key]=None
+                    continue
+                if (type(value) is int) | (type(value) is float):
+                    buffer=buffers[key]=np.full(rows, np.nan)
+                    integer[key]=True
+                else:
+                    buffer=buffers[key]=np.empty(rows, dtype=object)
+            
+            if buffer.dtype!=object:
+                if type(value) is not int:
+                    integer[key]=False
+                # value which is not a number moves column to object dtype
+                if (type(value) is not int) & (type(value) is not float) & (value is not None):
+                    buffer=buffers[key]=buffer.astype(object)
+            buffer[row]=value
+    
+    for key, buffer in buffers.items():
+        if buffer is None:
+            buffers[key]=np.empty(rows, dtype=object)
+        elif integer.get(key, False) and not np.isnan(buffer).any():
+            buffers[key]=buffer.astype('int64')
+    
+    if columns is not None:
+        buffers={key:buffers[key] for key in columns if key in buffers}
+    
+    return pd.DataFrame(buffers, copy=False)
+
+
+def _parse_dates(dates):
+    
+    '''
+    Return datetime64[ns] index for given date strings. Fixed 'yyyy-MM-dd' format used by api is parsed
+    on fast path without per-element format inference, other formats (e.g. with time component) fall back
+    to pd.to_datetime inference
+    '''
+    
+    try:
+        parsed=pd.to_datetime(dates, format='%Y-%m-%d', cache=True)
+    except ValueError:
+        parsed=pd.to_datetime(dates, cache=True)
+    
+    return parsed.astype('datetime64[ns]')
+
+
+def _daily_prices_df(data, symbol, columns=None):
+    
+    records=None
+    if isinstance(data, dict):
+        records=data.get('historical')
+    if records is None:
+        log.warning('unexpected response: %s', data)
+        records=[]
+    
+    return _daily_prices_frame(_records_df(records, _with_date(columns)), symbol)
+
+
+def _with_date(columns):
+    
+    # date column is always needed to build index of daily prices
+    if (columns is None) or ('date' in columns):
+        return columns
+    
+    return ['date', *columns]
+
+
+def _daily_prices_frame(df, symbol):
+    
+    df.attrs['instrument']=symbol
+    if df.empty:
+        return df
+    
+    df.index=pd.DatetimeIndex(_parse_dates(df.pop('date').to_numpy()), name='date')
+    df=df.sort_index()
+    return df
+
+
+def _stream_columns(raw, prefix, columns=None):
+    
+    '''
+    Return dict {column: numpy array or list} for records incrementally parsed from raw response body
+    under given ijson prefix. Numeric columns are collected in array.array buffers, so neither whole
+    json document nor list of record dicts is held in memory. Columns with integer values only are
+    returned as int64. If columns are given, other keys are skipped
+    '''
+    
+    wanted=None if columns is None else set(columns)
+    # keys in order of first appearance, buffer is created at first non-null value which declares its type
+    keys={}
+    buffers={}
+    integer={}
+    rows=0
+    for record in ijson.items(raw, prefix, use_float=True):
+        filled=0
+        for key, value in record.items():
+            buffer=buffers.get(key)
+            if buffer is None:
+                if (wanted is not None) and (key not in wanted):
+                    continue
+                keys[key]=None
+                if value is None:
+                    continue
+                if (type(value) is int) | (type(value) is float):
+                    buffer=buffers[key]=array.array('d', [np.nan])*rows
+                    integer[key]=(rows==0)
+                else:
+                    buffer=buffers[key]=[None]*rows
+            
+            if type(buffer) is list:
+                buffer.append(value)
+            elif type(value) is int:
+                buffer.append(value)
+            elif type(value) is float:
+                buffer.append(value)
+                integer[key]=False
+            elif value is None:
+                buffer.append(np.nan)
+                integer[key]=False
+            else:
+                buffer=buffers[key]=buffer.tolist()
+                buffer.append(value)
+            filled+=1
+        
+        rows+=1
+        # fill columns missing in this record, skipped keys are not counted so they can not hide missing ones
+        if filled!=len(buffers):
+            for key, buffer in buffers.items():
+                if len(buffer)<rows:
+                    if type(buffer) is list:
+                        buffer.append(None)
+                    else:
+                        buffer.append(np.nan)
+                        integer[key]=False
+    
+    values={}
+    for key in (keys if columns is None else [key for key in columns if key in keys]):
+        buffer=buffers.get(key, [None]*rows)
+        if type(buffer) is list:
+            values[key]=buffer
+        else:
+            values[key]=np.frombuffer(buffer, dtype='float64')
+            if integer[key]:
+                values[key]=values[key].astype('int64')
+    
+    return values
+
+
+HOUR=60*60
+DAY=24*HOUR
+
+# time to live of cached responses in seconds, matched by endpoint path prefix after /api/vX/
+CACHE_TTL={'profile':30*DAY,
+           'rating':DAY,
+           'historical-rating':DAY,
+           'analyst-stock-recommendations':DAY,
+           'balance-sheet-statement':90*DAY,
+           'income-statement':90*DAY,
+           'cash-flow-statement':90*DAY,
+           'financial-statement-full-as-reported':90*DAY,
+           'historical-price-full':DAY,
+           'stock_news':HOUR,
+           'forex_news':HOUR,
+           'crypto_news':HOUR,
+           'historical/social-sentiment':6*HOUR,
+           'symbol/available':7*DAY,
+           'stock/list':7*DAY}
+
+# max number of raw responses kept in memory by each FmpConnector
+MEMORY_CACHE_SIZE=512
+
+
+def _ttl_for(url, ttl):
+    
+    '''
+    Return time to live for given url from ttl dict, longest matching endpoint path prefix wins, 0 if none matches
+    '''
+    
+    path=urlsplit(url).path.split('/', 3)[-1]
+    prefixes=[prefix for prefix in ttl if path.startswith(prefix)]
+    if not prefixes:
+        return 0
+    
+    return ttl[max(prefixes, key=len)]
+
+
+class FileCache():
+    
+    '''
+    Description
+    ============================================
+    
+    Persistent on-disk cache of decoded api responses. Entries are stored as gzip compressed pickle
+    files named after md5 hash of endpoint url (without apikey) and expire after time to live defined
+    for endpoint family in ttl
+    
+    Attributes
+    ============================================
+    
+    dir - cache directory, default: ~/.fmp_cache
+    
+    ttl - dict {endpoint path prefix: seconds}, endpoints not matching any prefix are not cached, default: CACHE_TTL
+    
+    Methods
+    ============================================
+    
+    get - return cached payload for given url or None if it is missing or expired
+    
+    set - store payload for given url
+    
+    clear - remove all cached entries
+    
+    '''
+    
+    def __init__(self, dir='~/.fmp_cache', ttl=None):
+        
+        self.dir=os.path.expanduser(dir)
+        self.ttl=CACHE_TTL if ttl is None else ttl
+        os.makedirs(self.dir, exist_ok=True)
+    
+    def __repr__(self):
+        
+        return f'FileCache({self.dir})'
+    
+    def _ttl_for(self, url):
+        
+        return _ttl_for(url, self.ttl)
+    
+    def _path(self, url):
+        
+        return os.path.join(self.dir, hashlib.md5(url.encode()).hexdigest()+'.pkl.gz')
+    
+    def get(self, url):
+        
+        ttl=self._ttl_for(url)
+        if ttl<=0:
+            return None
+        
+        try:
+            with gzip.open(self._path(url), 'rb') as file:
+                entry=pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        
+        if time.time()-entry['ts']>ttl:
+            return None
+        
+        return entry['payload']
+    
+    def set(self, url, payload):
+        
+        if self._ttl_for(url)<=0:
+            return
+        
+        # write to unique temporary file first so concurrent readers never see partially written entry and
+        # concurrent writers (threads or processes) never share one
+        tmp_path=None
+        try:
+            fd, tmp_path=tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as file:
+                pickle.dump({'ts':time.time(), 'payload':payload}, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(url))
+        except (OSError, pickle.PicklingError) as error:
+            # cache is best effort, failed write must not fail data getter
+            log.warning('could not write cache entry for %s: %s', url, error)
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+    
+    def clear(self):
+        
+        for name in os.listdir(self.dir):
+            if name.endswith('.pkl.gz'):
+                os.remove(os.path.join(self.dir, name))
+
 
 class FmpConnector():
     
@@ -19,6 +507,21 @@ class FmpConnector():
     
     apikey - apikey from https://site.financialmodelingprep.com/ account
     
+    session - requests session with pooled keep-alive connections, apikey is passed as default query param
+    
+    cache - FileCache used to store responses on disk, True for default FileCache, False to disable, default: True.
+            Its ttl applies to in-memory cache too
+    
+    memory_cache - keep last MEMORY_CACHE_SIZE raw responses (parsed columns for streamed daily prices and
+                   full statements) and file cache hits in memory, expired after ttl of cache (CACHE_TTL
+                   without cache), False to disable, default: True
+    
+    retry_total - max number of retries of failed connection or RETRY_STATUSES response, default: RETRY_TOTAL
+    
+    retry_backoff - backoff factor in seconds, n-th retry waits retry_backoff*2**(n-1), default: RETRY_BACKOFF
+    
+    connected - True if apikey is accepted by api, checked on first access
+    
     Methods
     ============================================
     
@@ -26,6 +529,8 @@ class FmpConnector():
     
     get_financial_data - return financial data, statements for given company from given period
     
+    get_all_statements - return balance, income and cashflow statements for given company, downloaded concurrently
+    
     get_instruments - return all available instruments of given type
     
     get_daily_prices - return daily prices of given instrument from whole available time period
@@ -34,26 +539,182 @@ class FmpConnector():
     
     get_sentiment - return historical social sentiment for given stock company
     
-    draw_chart - return plotly figure with chart for defined kind
+    draw_chart - return plotly figure with chart for defined kind, updates passed figure in place. Figure is
+                 not rendered, call .show() on it to display chart
     
     '''
     
-    def __init__(self, apikey):
+    def __init__(self, apikey, cache=True, memory_cache=True, retry_total=RETRY_TOTAL, retry_backoff=RETRY_BACKOFF):
         
         self.apikey=apikey
-        test_endpoint=f'https://financialmodelingprep.com/api/v3/profile/AAPL?apikey={self.apikey}'
-        response=requests.get(test_endpoint)
-        if response.status_code==200:
-            print('Connected')
-        
+        self.cache=FileCache() if cache is True else (cache or None)
+        # memory entries expire like file cache ones, empty ttl turns in-memory cache off
+        if not memory_cache:
+            self._memory_ttl={}
         else:
-            print(response.json())
+            self._memory_ttl=CACHE_TTL if self.cache is None else self.cache.ttl
+        self.timeout=(5,30)
+        self.session=requests.Session()
+        self.session.params={'apikey':self.apikey}
+        retries=Retry(total=retry_total, backoff_factor=retry_backoff, status_forcelist=RETRY_STATUSES,
+                      respect_retry_after_header=True)
+        self.session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retries))
+        self._connected=None
+        self._skeleton=None
+        self._instruments_cache={}
+        self._responses=OrderedDict()
+        self._responses_lock=threading.Lock()
        
     def __repr__(self):
         
         return 'FmpConnector module'
     
-    def get_company_info(self, symbol, limit=10, info_type='company_profile'):
+    @property
+    def connected(self):
+        
+        '''
+        True if apikey is accepted by api. Test request is sent on first access only, so creating
+        connector does not cost any request
+        '''
+        
+        if self._connected is None:
+            response=self._request(f'{BASE_URL}/v3/profile/AAPL', raise_status=False)
+            self._connected=response.ok
+            if not self._connected:
+                # response body is decoded only if warning is going to be emitted
+                if log.isEnabledFor(logging.WARNING):
+                    log.warning('apikey check failed: %s', response.text)
+        
+        return self._connected
+    
+    def _request(self, endpoint, raise_status=True, **kwargs):
+        
+        '''
+        Return response for given endpoint, transient errors are retried by session adapter.
+        Raise FmpError if request fails or, with raise_status, if api returns error status
+        '''
+        
+        try:
+            response=self.session.get(endpoint, timeout=self.timeout, **kwargs)
+        except requests.RequestException as error:
+            # error message contains full url with apikey, original exception is not chained to keep it out of tracebacks
+            raise _request_error(f"request to {endpoint} failed: {str(error).replace(self.apikey, '***')}") from None
+        
+        if raise_status & (not response.ok):
+            raise _request_error(f'request to {endpoint} failed with status {response.status_code}: {response.text}')
+        
+        return response
+    
+    def _get_cached(self, endpoint):
+        
+        '''
+        Return raw response body (or parsed columns for streamed endpoints) for given cache key from in-memory
+        LRU cache, None if it is missing or expired
+        '''
+        
+        with self._responses_lock:
+            entry=self._responses.get(endpoint)
+            if entry is None:
+                return None
+            if time.time()-entry[0]>_ttl_for(endpoint, self._memory_ttl):
+                del self._responses[endpoint]
+                return None
+            self._responses.move_to_end(endpoint)
+        
+        return entry[1]
+    
+    def _set_cached(self, endpoint, content):
+        
+        if _ttl_for(endpoint, self._memory_ttl)<=0:
+            return
+        
+        with self._responses_lock:
+            self._responses[endpoint]=(time.time(), content)
+            self._responses.move_to_end(endpoint)
+            if len(self._responses)>MEMORY_CACHE_SIZE:
+                self._responses.popitem(last=False)
+    
+    def _get_cached_json(self, endpoint):
+        
+        '''
+        Return decoded response for given endpoint from memory or file cache, None if it is not cached
+        '''
+        
+        content=self._get_cached(endpoint)
+        if content is not None:
+            # file cache hits are promoted to memory already decoded, fetched responses as raw body
+            return _decode_json(content) if isinstance(content, bytes) else content
+        
+        if self.cache is not None:
+            data=self.cache.get(endpoint)
+            if data is not None:
+                self._set_cached(endpoint, data)
+            return data
+        
+        return None
+    
+    def _get_json(self, endpoint, force_refresh=False):
+        
+        '''
+        Return decoded response for given endpoint. Raw responses are kept in memory for repeated calls
+        within process, decoded ones in file cache for repeated sessions
+        '''
+        
+        if not force_refresh:
+            data=self._get_cached_json(endpoint)
+            if data is not None:
+                return data
+        
+        content=self._request(endpoint).content
+        data=_decode_json(content)
+        # empty payload ({} for unknown symbol) is not cached, so it is not served for whole time to live
+        if data:
+            self._set_cached(endpoint, content)
+            if self.cache is not None:
+                self.cache.set(endpoint, data)
+        
+        return data
+    
+    def _get_columns(self, endpoint, prefix, force_refresh=False, columns=None):
+        
+        '''
+        Return dict {column: values} for records under given ijson prefix, response body is streamed
+        and parsed incrementally instead of being decoded as a whole. If columns are given, only those
+        are collected
+        '''
+        
+        # parsed columns are cached under separate key for each selection, so they never collide with
+        # decoded payload of the same endpoint
+        cache_key=endpoint+'#columns'
+        if columns is not None:
+            cache_key+='='+','.join(columns)
+        if not force_refresh:
+            values=self._get_cached(cache_key)
+            if values is not None:
+                return values
+            
+            if self.cache is not None:
+                values=self.cache.get(cache_key)
+                if values is not None:
+                    self._set_cached(cache_key, values)
+                    return values
+        
+        with self._request(endpoint, stream=True) as response:
+            response.raw.decode_content=True
+            values=_stream_columns(response.raw, prefix, columns)
+        
+        # no records means unknown symbol or error payload, it is logged like on decoded path and not cached
+        if not values:
+            log.warning("unexpected response: no records under '%s' in %s", prefix, endpoint)
+            return values
+        
+        self._set_cached(cache_key, values)
+        if self.cache is not None:
+            self.cache.set(cache_key, values)
+        
+        return values
+    
+    def get_company_info(self, symbol, limit=10, info_type='company_profile', force_refresh=False):
         
         '''
         Description
@@ -65,6 +726,7 @@ class FmpConnector():
         *symbol -> str
         info_type -> str{company_profile, company_rating, historical_rating, recommendations}, default: company_profile
         limit -> number - required only for historical_rating and recommendations info type, default: 10
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
         
         Returns
         ============================================
@@ -72,33 +734,14 @@ class FmpConnector():
         
         '''
         
-        company_info_dict={'company_profile':f'https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={self.apikey}',
-                          'company_rating':f'https://financialmodelingprep.com/api/v3/rating/{symbol}?apikey={self.apikey}',
-                          'historical_rating':f'https://financialmodelingprep.com/api/v3/historical-rating/{symbol}?limit={limit}&apikey={self.apikey}',
-                        'recommendations':f'https://financialmodelingprep.com/api/v3/analyst-stock-recommendations/{symbol}?limit={limit}&apikey={self.apikey}'}
-        
         data=None
-        df=pd.DataFrame()
-        try:
-            endpoint=company_info_dict[info_type]
-            data=requests.get(endpoint).json()
-            
-        
-        except KeyError:
-            print(f"'{info_type}' is not valid info_type - choose info type from possible options [company_profile, company_rating, historical_rating, recommendations]")
-            
-        try:
-            if info_type not in ['historical_rating', 'recommendations']:
-                df=pd.DataFrame.from_dict(data).T
-                df=df.rename(columns={0:'info'})
-            else:
-                df=pd.DataFrame.from_dict(data)
-        except ValueError:
-            print(data)
+        endpoint=_build_url('company_info', info_type, symbol=symbol, limit=limit)
+        if endpoint!=None:
+            data=self._get_json(endpoint, force_refresh)
         
-        return df
+        return _company_info_df(data, info_type)
     
-    def get_financial_data(self, symbol, report_type='balance_statement', period='annual', limit=10, as_reported=False):
+    def get_financial_data(self, symbol, report_type='balance_statement', period='annual', limit=10, as_reported=False, force_refresh=False, columns=None):
         '''
         Description
         ============================================
@@ -111,6 +754,8 @@ class FmpConnector():
         period -> str{annual, quarter}, default: annual
         limit -> number, default: 10
         as_reported -> boolean{True, False}, default: False
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
+        columns -> list of str - columns to keep, other fields are dropped before dataframe is built, default: None (all columns)
         
         
         Returns
@@ -119,43 +764,65 @@ class FmpConnector():
         
         '''
         
-        report_type_dict={'balance_statement':[f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{symbol}?period={period}&limit={limit}&apikey={self.apikey}',
-                                              f'https://financialmodelingprep.com/api/v3/balance-sheet-statement-as-reported/{symbol}?period={period}&limit={limit}&apikey={self.apikey}'],
-                         'income_statement':[f'https://financialmodelingprep.com/api/v3/income-statement/{symbol}?period={period}&limit={limit}&apikey={self.apikey}',
-                                            f'https://financialmodelingprep.com/api/v3/income-statement-as-reported/{symbol}?period={period}&limit={limit}&apikey={self.apikey}'],
-                         'cashflow_statement':[f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{symbol}?period={period}&limit={limit}&apikey={self.apikey}',
-                                              f'https://financialmodelingprep.com/api/v3/cash-flow-statement-as-reported/{symbol}?period={period}&limit={limit}&apikey={self.apikey}'],
-                         'full_statement':[f'https://financialmodelingprep.com/api/v3/financial-statement-full-as-reported/{symbol}?period={period}&limit={limit}&apikey={self.apikey}']}
-        
         if period not in ['annual', 'quarter']:
-            print(f"'{period}' is not valid option for period - choose from possible options [annual, quarter]")
+            log.error("'%s' is not valid option for period - choose from possible options [annual, quarter]", period)
             return 0
         
+        data=None
+        endpoint=_build_url('financial_data', report_type, symbol=symbol, period=period, limit=limit, as_reported=as_reported)
+        if endpoint!=None:
+            if (report_type=='full_statement') & (ijson is not None):
+                return pd.DataFrame(self._get_columns(endpoint, 'item', force_refresh, columns))
+            data=self._get_json(endpoint, force_refresh)
+        
+        return _financial_data_df(data, report_type, columns)
+           
+    def get_all_statements(self, symbol, period='annual', limit=10, as_reported=False, force_refresh=False, columns=None):
+        '''
+        Description
+        ============================================
+        Return balance, income and cashflow statements for given company from given period, statements
+        missing in cache are downloaded concurrently
+        
+        Parameters
+        ============================================
+        *symbol -> str
+        period -> str{annual, quarter}, default: annual
+        limit -> number, default: 10
+        as_reported -> boolean{True, False}, default: False
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
+        columns -> list of str - columns to keep, other fields are dropped before dataframe is built, default: None (all columns)
         
         
-        data=None
-        df=pd.DataFrame()
-        try:
-            endpoint=report_type_dict[report_type][0]
-            if (as_reported==True) & (report_type!='full_statement'):
-                endpoint=report_type_dict[report_type][1]
-            data=requests.get(endpoint).json()
-            
+        Returns
+        ============================================
+        dict {balance, income, cashflow} of pandas dataframes
         
-        except KeyError:
-            print(f"'{report_type}' is not valid report_type - choose info type from possible options [balance_statement, income_statement, cashflow_statement, full_statement]")
+        '''
         
-        try:
+        if period not in ['annual', 'quarter']:
+            log.error("'%s' is not valid option for period - choose from possible options [annual, quarter]", period)
+            return 0
+        
+        report_types={'balance':'balance_statement', 'income':'income_statement', 'cashflow':'cashflow_statement'}
+        statements={}
+        futures={}
+        with ThreadPoolExecutor(max_workers=len(report_types)) as executor:
+            for name, report_type in report_types.items():
+                endpoint=_build_url('financial_data', report_type, symbol=symbol, period=period, limit=limit, as_reported=as_reported)
+                data=None if force_refresh else self._get_cached_json(endpoint)
+                if data is not None:
+                    statements[name]=_financial_data_df(data, columns=columns)
+                else:
+                    # cache was already checked, task only downloads and writes response through
+                    futures[executor.submit(self._get_json, endpoint, True)]=name
             
-            df=pd.DataFrame.from_dict(data)
-            df=df.rename(columns={0:'info'})
-           
-        except ValueError:
-            print(data)
+            for future in as_completed(futures):
+                statements[futures[future]]=_financial_data_df(future.result(), columns=columns)
         
-        return df
-           
-    def get_instruments(self, asset_type):
+        return {name:statements[name] for name in report_types}
+    
+    def get_instruments(self, asset_type, force_refresh=False):
         '''
         Description
         ============================================
@@ -164,6 +831,7 @@ class FmpConnector():
         Parameters
         ============================================
         *asset_type -> str{'forex','stock','crypto','commodities'}
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
         
         Returns
         ============================================
@@ -171,32 +839,25 @@ class FmpConnector():
         
         '''
         
-        
-        asset_type_dict={'forex':f'https://financialmodelingprep.com/api/v3/symbol/available-forex-currency-pairs?apikey={self.apikey}',
-                        'stock':f'https://financialmodelingprep.com/api/v3/stock/list?apikey={self.apikey}',
-                         'commodities':f'https://financialmodelingprep.com/api/v3/symbol/available-commodities?apikey={self.apikey}',
-                         'crypto':f'https://financialmodelingprep.com/api/v3/symbol/available-cryptocurrencies?apikey={self.apikey}'}
+        # in-process cache serves repeated calls without reading file cache and building dataframe again
+        cached=None if force_refresh else self._instruments_cache.get(asset_type)
+        if (cached is not None) and (time.monotonic()-cached[0]<DAY):
+            return cached[1].copy()
         
         data=None
-        df=pd.DataFrame
-        try:
-            
-            endpoint=asset_type_dict[asset_type]
-            data=requests.get(endpoint).json()
-            
+        endpoint=_build_url('instruments', asset_type)
+        if endpoint!=None:
+            data=self._get_json(endpoint, force_refresh)
         
-        except KeyError:
-            print(f"'{asset_type}' is not valid asset_type - choose info type from possible options [forex, stock, crypto, commodities]")
-        
-        try:
-            df=pd.DataFrame.from_dict(data)
-        except ValueError:
-            print(data)
+        df=_records_df(data)
+        if not df.empty:
+            self._instruments_cache[asset_type]=(time.monotonic(), df)
+            df=df.copy()
         
         return df
         
         
-    def get_daily_prices(self, symbol):
+    def get_daily_prices(self, symbol, force_refresh=False, columns=None):
         
         '''
         Description
@@ -207,6 +868,8 @@ class FmpConnector():
         ============================================
         
         *symbol -> str - symbol of given instrument
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
+        columns -> list of str - columns to keep (date is always kept as index), default: None (all columns)
         
         Returns
         ============================================
@@ -214,21 +877,15 @@ class FmpConnector():
         
         '''
             
-        endpoint=f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={self.apikey}'
-        data=requests.get(endpoint).json()
-        df=pd.DataFrame()
-        try:
-            df=pd.DataFrame.from_dict(data['historical'])
-        
-        except ValueError:
-            print(data)
-        df.attrs['instrument']=symbol
-        df['date']=pd.to_datetime(df['date'])
-        df=df.set_index('date')
-        df=df.sort_index()
-        return df
+        endpoint=_build_url('daily_prices', symbol=symbol)
+        if ijson is None:
+            return _daily_prices_df(self._get_json(endpoint, force_refresh), symbol, columns)
+        
+        values=self._get_columns(endpoint, 'historical.item', force_refresh, _with_date(columns))
+        
+        return _daily_prices_frame(pd.DataFrame(values), symbol)
     
-    def get_market_news(self, market_type, symbol=None, limit=10):
+    def get_market_news(self, market_type, symbol=None, limit=10, force_refresh=False):
         
         '''
         Description
@@ -241,6 +898,7 @@ class FmpConnector():
         symbols ->  - symbol of given instrument, default: None
         *market_type -> str{'stock','forex','crypto'} 
         limit -> number, default: 10
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
         
         Returns
         ============================================
@@ -248,34 +906,14 @@ class FmpConnector():
         
         '''
         
-        market_type_dict={'stock':[f'https://financialmodelingprep.com/api/v3/stock_news?limit={limit}&apikey={self.apikey}',
-                                   f'https://financialmodelingprep.com/api/v3/stock_news?tickers={symbol}&limit={limit}&apikey={self.apikey}'],
-                          'forex':[f'https://financialmodelingprep.com/api/v4/forex_news?limit={limit}&apikey={self.apikey}',
-                                   f'https://financialmodelingprep.com/api/v4/forex_news?symbol={symbol}&limit={limit}&apikey={self.apikey}'],
-                          'crypto':[f'https://financialmodelingprep.com/api/v4/crypto_news?limit={limit}&apikey={self.apikey}',
-                                    f'https://financialmodelingprep.com/api/v4/crypto_news?symbol={symbol}&limit={limit}&apikey={self.apikey}',]}
-        
-        
         data=None
-        df=pd.DataFrame
-        try:
-            endpoint=market_type_dict[market_type][0]
-            if symbol!=None:
-                endpoint=market_type_dict[market_type][1]
-            data=requests.get(endpoint).json()
-            
-        
-        except KeyError:
-            print(f"'{market_type}' is not valid market_type - choose info type from possible options [stock,forex,crypto]")
-        
-        try:
-            df=pd.DataFrame.from_dict(data)
-        except ValueError:
-            print(data)
+        endpoint=_build_url('market_news', market_type, symbol=symbol, limit=limit)
+        if endpoint!=None:
+            data=self._get_json(endpoint, force_refresh)
         
-        return df
+        return _records_df(data)
         
-    def get_sentiment(self, symbol, limit=10):
+    def get_sentiment(self, symbol, limit=10, force_refresh=False):
         '''
         Description
         ============================================
@@ -285,6 +923,7 @@ class FmpConnector():
         ============================================
         *symbol -> str
         limit -> number, default:10
+        force_refresh -> boolean{True, False} - skip cache and download data again, default: False
         
         
         Returns
@@ -292,17 +931,12 @@ class FmpConnector():
         pandas dataframe
         '''
         
-        endpoint=f'https://financialmodelingprep.com/api/v4/historical/social-sentiment?symbol={symbol}&limit={limit}&apikey={self.apikey}'
-        data=requests.get(endpoint).json()
-        df=pd.DataFrame()
-        try:
-            df=pd.DataFrame.from_dict(data)
-        except ValueError:
-            print(data)
+        endpoint=_build_url('sentiment', symbol=symbol, limit=limit)
+        data=self._get_json(endpoint, force_refresh)
         
-        return df
+        return _records_df(data)
         
-    def draw_chart(self, df, start=None, end=None, chart_type='candle'):
+    def draw_chart(self, df, start=None, end=None, chart_type='candle', figure=None):
         '''
         Description
         ============================================
@@ -315,74 +949,514 @@ class FmpConnector():
         start -> str in format 'yyyy-MM-dd', default: None
         end -> str in format 'yyyy-MM-dd', default: None
         chart_type -> str{'candle','line','ohlc'}, default: candle
+        figure -> plotly figure returned by previous draw_chart call - its traces are updated instead of
+                  building new figure, default: None
         
         
         Returns
         ============================================
-        plotly figure
+        plotly figure - call figure.show() to render it
         '''
         
         if chart_type not in ['candle','line','ohlc']:
-            print(f"'{chart_type}' is not valid option for chart_type - choose from possible options ['candle','line','ohlc']")
+            log.error("'%s' is not valid option for chart_type - choose from possible options ['candle','line','ohlc']", chart_type)
             return 0
-        start_to_plot=df.index[0]
-        end_to_plot=df.index[-1]
-        
-        df_plot=None
-        if ((start!=None) & (end==None)):
-            df_plot=df.loc[start:]
-            start_to_plot=start
-        elif ((end!=None) & (start==None)):
-            df_plot=df.loc[:end]
-            end_to_plot=end
-        elif ((end!=None) & (start!=None)):
-            df_plot=df.loc[start:end]
-            start_to_plot=start
-            end_to_plot=end
-        else:
-            df_plot=df
+        start_to_plot=start if start!=None else df.index[0]
+        end_to_plot=end if end!=None else df.index[-1]
+        
+        df_plot=df.loc[start_to_plot:end_to_plot]
+        # attrs are not propagated by .loc slicing in every pandas version
+        df_plot.attrs=df.attrs
         
         symbol=df_plot.attrs['instrument']
         interval='daily'
         if 'interval' in list(df_plot.attrs.keys()):
             interval=df_plot.attrs['interval']
         
+        # numpy arrays are passed to traces, so plotly does not convert index and series for each of them
+        x=df_plot.index.values
+        volume=df_plot['volume'].to_numpy()
+        close=df_plot['close'].to_numpy()
+        if chart_type=='line':
+            trace_class=go.Scatter
+            values=dict(x=x, y=close, name=symbol)
+        else:
+            trace_class=go.Candlestick if chart_type=='candle' else go.Ohlc
+            values=dict(x=x,
+                        open=df_plot['open'].to_numpy(),
+                        high=df_plot['high'].to_numpy(),
+                        low=df_plot['low'].to_numpy(),
+                        close=close,
+                        name=symbol)
+        
         title=f'|CHART TYPE: {chart_type} |SYMBOL: {symbol} |INTERVAL: {interval} |START: {start_to_plot} |END: {end_to_plot}'
-        figure=make_subplots(rows=2, cols=1, row_heights=[0.8,0.2], shared_xaxes=True,
-                        vertical_spacing=0.01)
-        figure.update_layout(height=800)
-        figure.add_trace(go.Bar(x=df_plot.index,y=df_plot['volume'], name='volume', marker_color='blue'), row=2, col=1)
+        if figure is None:
+            figure=self._chart_skeleton()
+            figure.add_trace(go.Bar(x=x,y=volume, name='volume', marker_color='blue'), row=2, col=1)
+            figure.add_trace(trace_class(**values), row=1, col=1)
+            figure.update_layout(title=title)
+            return figure
+        
+        # traces of passed figure are updated in place, so plotly sends only changed data on redraw
+        with figure.batch_update():
+            figure.layout.title.text=title
+            figure.data[0].update(x=x, y=volume)
+            if isinstance(figure.data[1], trace_class):
+                figure.data[1].update(**values)
+        
+        if not isinstance(figure.data[1], trace_class):
+            figure.data=figure.data[:1]
+            figure.add_trace(trace_class(**values), row=1, col=1)
+        
+        return figure
+    
+    def _chart_skeleton(self):
         
-            
-            
-        if chart_type=='candle':
-            
-            figure.add_trace(go.Candlestick(x=df_plot.index,
-                    open=df_plot['open'],
-                    high=df_plot['high'],
-                    low=df_plot['low'],
-                    close=df_plot['close'],
-                    name=df_plot.attrs['instrument']), row=1, col=1)
-
-        elif chart_type=='line':
-            
-            figure.add_trace(go.Scatter(x=df_plot.index,y=df_plot['close'],name=df_plot.attrs['instrument']), row=1, col=1)
-            
+        '''
+        Return copy of empty two-row (price, volume) chart figure, subplots layout is built once per connector
+        '''
         
-        elif chart_type=='ohlc':
-            
-             figure.add_trace(go.Ohlc(x=df_plot.index,
-                    open=df_plot['open'],
-                    high=df_plot['high'],
-                    low=df_plot['low'],
-                    close=df_plot['close'],
-                    name=df_plot.attrs['instrument']), row=1, col=1)
-        figure.update_layout(title=title,xaxis_rangeslider_visible=False)
-        figure.update_xaxes(rangebreaks=[dict(bounds=['sat', 'mon'])])
-        figure.show()
+        if self._skeleton is None:
+            self._skeleton=make_subplots(rows=2, cols=1, row_heights=[0.8,0.2], shared_xaxes=True,
+                            vertical_spacing=0.01)
+            self._skeleton.update_layout(height=800, xaxis_rangeslider_visible=False)
+            self._skeleton.update_xaxes(rangebreaks=[dict(bounds=['sat', 'mon'])])
         
+        return go.Figure(self._skeleton)
+
+
+class BatchScheduler():
+    
+    '''
+    Description
+    ============================================
+    
+    Asynchronous micro-batching of per-symbol requests for endpoints accepting comma separated
+    symbols (e.g. /v3/profile/AAPL,MSFT,GOOG). Symbols submitted within max_wait_ms window are
+    sent as one request per max_batch symbols and the response is split back per symbol
+    
+    Attributes
+    ============================================
+    
+    fetch - coroutine function returning decoded json for given endpoint
+    
+    build_url - function returning endpoint for comma separated symbols
+    
+    max_batch - max number of symbols in one request, default: 100
+    
+    max_wait_ms - how long to wait for more symbols before sending request, default: 20
+    
+    '''
+    
+    def __init__(self, fetch, build_url, max_batch=100, max_wait_ms=20):
+        
+        self.fetch=fetch
+        self.build_url=build_url
+        self.max_batch=max_batch
+        self.max_wait_ms=max_wait_ms
+        self._pending={}
+        self._timer=None
+        self._tasks=set()
+    
+    def submit(self, symbol):
         
+        '''
+        Return future resolved with list containing record for given symbol (empty list if api
+        did not return it)
+        '''
         
+        loop=asyncio.get_running_loop()
+        future=loop.create_future()
+        self._pending.setdefault(symbol, []).append(future)
+        if len(self._pending)>=self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer=loop.call_later(self.max_wait_ms/1000, self._dispatch)
         
+        return future
+    
+    def _dispatch(self):
+        
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer=None
+        
+        batch, self._pending=self._pending, {}
+        if batch:
+            task=asyncio.get_running_loop().create_task(self._send(batch))
+            # keep reference so task is not garbage collected before it is done
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _send(self, batch):
         
+        try:
+            data=await self.fetch(self.build_url(','.join(batch)))
+        except Exception as error:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+            return
+        
+        records={}
+        if isinstance(data, list):
+            records={str(record.get('symbol')).upper():record for record in data}
+        
+        for symbol, futures in batch.items():
+            record=records.get(symbol.upper())
+            for future in futures:
+                if not future.done():
+                    future.set_result([record] if record is not None else [])
+
+
+class FmpAsyncConnector():
     
+    '''
+    Description
+    ============================================
+    
+    Asynchronous counterpart of FmpConnector for multi-symbol workloads. Requests are issued
+    concurrently with aiohttp, number of requests in flight is bounded by concurrency
+    
+    Attributes
+    ============================================
+    
+    apikey - apikey from https://site.financialmodelingprep.com/ account
+    
+    concurrency - max number of requests in flight, default: 32
+    
+    retry_total - max number of retries of failed connection or RETRY_STATUSES response, default: RETRY_TOTAL
+    
+    retry_backoff - backoff factor in seconds, n-th retry waits retry_backoff*2**(n-1) unless api sends
+                    Retry-After header, default: RETRY_BACKOFF
+    
+    Company profiles are fetched through BatchScheduler - concurrent aget_company_info calls are
+    merged into requests for up to 100 symbols, other endpoints are requested per symbol
+    
+    Methods
+    ============================================
+    
+    aget_company_info - async version of FmpConnector.get_company_info
+    
+    aget_financial_data - async version of FmpConnector.get_financial_data
+    
+    aget_instruments - async version of FmpConnector.get_instruments
+    
+    aget_daily_prices - async version of FmpConnector.get_daily_prices
+    
+    aget_market_news - async version of FmpConnector.get_market_news
+    
+    aget_sentiment - async version of FmpConnector.get_sentiment
+    
+    fetch_many - run chosen aget_* method for many symbols concurrently
+    
+    get_daily_prices_many - return daily prices for many symbols
+    
+    close - close underlying http session
+    
+    Usage
+    ============================================
+    
+    async with FmpAsyncConnector(apikey) as fmp:
+        prices=await fmp.get_daily_prices_many(['AAPL', 'MSFT'])
+    
+    Connector can be reused in later event loops (e.g. separate asyncio.run calls), its session and
+    semaphore are rebuilt for each loop
+    
+    '''
+    
+    def __init__(self, apikey, concurrency=32, retry_total=RETRY_TOTAL, retry_backoff=RETRY_BACKOFF):
+        
+        if aiohttp is None:
+            raise ImportError('FmpAsyncConnector requires aiohttp - install it with pip install aiohttp')
+        
+        self.apikey=apikey
+        self.concurrency=concurrency
+        self.retry_total=retry_total
+        self.retry_backoff=retry_backoff
+        self._loop=None
+        self._semaphore=asyncio.Semaphore(concurrency)
+        self._session=None
+        self._profile_batcher=BatchScheduler(self._fetch, lambda symbols: _build_url('company_info', 'company_profile', symbol=symbols))
+    
+    def __repr__(self):
+        
+        return 'FmpAsyncConnector module'
+    
+    async def __aenter__(self):
+        
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        
+        await self.close()
+    
+    async def _bind_loop(self):
+        
+        '''
+        Rebuild semaphore, session and profile batcher when connector is reused in another event loop
+        (e.g. in next asyncio.run call without close), they are bound to loop they were first used in
+        '''
+        
+        loop=asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        
+        stale_session=None
+        if self._loop is not None:
+            stale_session, self._session=self._session, None
+            self._semaphore=asyncio.Semaphore(self.concurrency)
+            self._profile_batcher=BatchScheduler(self._fetch, self._profile_batcher.build_url,
+                                                 self._profile_batcher.max_batch, self._profile_batcher.max_wait_ms)
+        # loop is switched before awaiting, so concurrent calls do not rebuild it again
+        self._loop=loop
+        if stale_session is not None:
+            # connections of closed loop are already gone, closing only marks session as closed
+            await stale_session.close()
+    
+    def _get_session(self):
+        
+        # aiohttp session has to be created inside running event loop
+        if self._session is None or self._session.closed:
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+            self._session=aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(sock_connect=5, sock_read=30))
+        return self._session
+    
+    async def close(self):
+        
+        '''
+        Close underlying aiohttp session, called automatically when connector is used as async context manager
+        '''
+        
+        if self._session is not None:
+            await self._session.close()
+            self._session=None
+    
+    async def _fetch(self, endpoint):
+        
+        await self._bind_loop()
+        async with self._semaphore:
+            for attempt in range(self.retry_total+1):
+                retry_after=None
+                try:
+                    async with self._get_session().get(endpoint, params={'apikey':self.apikey}) as response:
+                        if (response.status in RETRY_STATUSES) & (attempt<self.retry_total):
+                            retry_after=response.headers.get('Retry-After')
+                        elif response.status>=400:
+                            raise _request_error(f'request to {endpoint} failed with status {response.status}: {await response.text()}')
+                        else:
+                            return _decode_json(await response.read())
+                except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                    # connection errors and timeouts are retried like RETRY_STATUSES responses
+                    if attempt==self.retry_total:
+                        raise _request_error(f"request to {endpoint} failed: {str(error).replace(self.apikey, '***')}") from None
+                
+                await asyncio.sleep(_retry_delay(retry_after, attempt, self.retry_backoff))
+    
+    async def aget_company_info(self, symbol, limit=10, info_type='company_profile'):
+        
+        '''
+        Description
+        ============================================
+        Async version of FmpConnector.get_company_info, company profiles requested concurrently are batched
+        
+        Parameters
+        ============================================
+        *symbol -> str
+        info_type -> str{company_profile, company_rating, historical_rating, recommendations}, default: company_profile
+        limit -> number - required only for historical_rating and recommendations info type, default: 10
+        
+        Returns
+        ============================================
+        pandas dataframe
+        
+        '''
+        
+        # profiles requested concurrently are batched into /profile/AAPL,MSFT,... requests
+        if info_type=='company_profile':
+            await self._bind_loop()
+            data=await self._profile_batcher.submit(symbol)
+            return _company_info_df(data, info_type)
+        
+        data=None
+        endpoint=_build_url('company_info', info_type, symbol=symbol, limit=limit)
+        if endpoint!=None:
+            data=await self._fetch(endpoint)
+        
+        return _company_info_df(data, info_type)
+    
+    async def aget_financial_data(self, symbol, report_type='balance_statement', period='annual', limit=10, as_reported=False, columns=None):
+        
+        '''
+        Description
+        ============================================
+        Async version of FmpConnector.get_financial_data
+        
+        Parameters
+        ============================================
+        *symbol -> str
+        report_type -> str{balance_statement, income_statement, cashflow_statement, full_statement}, default: balance_statement
+        period -> str{annual, quarter}, default: annual
+        limit -> number, default: 10
+        as_reported -> boolean{True, False}, default: False
+        columns -> list of str - columns to keep, other fields are dropped before dataframe is built, default: None (all columns)
+        
+        Returns
+        ============================================
+        pandas dataframe
+        
+        '''
+        
+        if period not in ['annual', 'quarter']:
+            log.error("'%s' is not valid option for period - choose from possible options [annual, quarter]", period)
+            return 0
+        
+        data=None
+        endpoint=_build_url('financial_data', report_type, symbol=symbol, period=period, limit=limit, as_reported=as_reported)
+        if endpoint!=None:
+            data=await self._fetch(endpoint)
+        
+        return _financial_data_df(data, report_type, columns)
+    
+    async def aget_instruments(self, asset_type):
+        
+        '''
+        Description
+        ============================================
+        Async version of FmpConnector.get_instruments
+        
+        Parameters
+        ============================================
+        *asset_type -> str{'forex','stock','crypto','commodities'}
+        
+        Returns
+        ============================================
+        pandas dataframe
+        
+        '''
+        
+        data=None
+        endpoint=_build_url('instruments', asset_type)
+        if endpoint!=None:
+            data=await self._fetch(endpoint)
+        
+        return _records_df(data)
+    
+    async def aget_daily_prices(self, symbol, columns=None):
+        
+        '''
+        Description
+        ============================================
+        Async version of FmpConnector.get_daily_prices
+        
+        Parameters
+        ============================================
+        *symbol -> str - symbol of given instrument
+        columns -> list of str - columns to keep (date is always kept as index), default: None (all columns)
+        
+        Returns
+        ============================================
+        pandas dataframe
+        
+        '''
+        
+        data=await self._fetch(_build_url('daily_prices', symbol=symbol))
+        
+        return _daily_prices_df(data, symbol, columns)
+    
+    async def aget_market_news(self, market_type, symbol=None, limit=10):
+        
+        '''
+        Description
+        ============================================
+        Async version of FmpConnector.get_market_news
+        
+        Parameters
+        ============================================
+        symbol -> str - symbol of given instrument, default: None
+        *market_type -> str{'stock','forex','crypto'}
+        limit -> number, default: 10
+        
+        Returns
+        ============================================
+        pandas dataframe
+        
+        '''
+        
+        data=None
+        endpoint=_build_url('market_news', market_type, symbol=symbol, limit=limit)
+        if endpoint!=None:
+            data=await self._fetch(endpoint)
+        
+        return _records_df(data)
+    
+    async def aget_sentiment(self, symbol, limit=10):
+        
+        '''
+        Description
+        ============================================
+        Async version of FmpConnector.get_sentiment
+        
+        Parameters
+        ============================================
+        *symbol -> str
+        limit -> number, default:10
+        
+        Returns
+        ============================================
+        pandas dataframe
+        
+        '''
+        
+        data=await self._fetch(_build_url('sentiment', symbol=symbol, limit=limit))
+        
+        return _records_df(data)
+    
+    async def fetch_many(self, symbols, method='daily_prices', **kwargs):
+        
+        '''
+        Description
+        ============================================
+        Run chosen aget_* method for every symbol concurrently
+        
+        Parameters
+        ============================================
+        *symbols -> list of str
+        method -> str{company_info, financial_data, daily_prices, market_news, sentiment}, default: daily_prices
+        **kwargs -> additional parameters passed to chosen method
+        
+        Returns
+        ============================================
+        dict {symbol: pandas dataframe}, failed requests are returned as exception instances
+        
+        '''
+        
+        coroutine=getattr(self, f'aget_{method}')
+        if method=='market_news':
+            tasks=[coroutine(symbol=symbol, **kwargs) for symbol in symbols]
+        else:
+            tasks=[coroutine(symbol, **kwargs) for symbol in symbols]
+        results=await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return dict(zip(symbols, results))
+    
+    async def get_daily_prices_many(self, symbols, columns=None):
+        
+        '''
+        Description
+        ============================================
+        Return all available daily prices for every given instrument
+        
+        Parameters
+        ============================================
+        *symbols -> list of str
+        columns -> list of str - columns to keep (date is always kept as index), default: None (all columns)
+        
+        Returns
+        ============================================
+        dict {symbol: pandas dataframe}, failed requests are returned as exception instances (e.g. FmpError)
+        
+        '''
+        
+        return await self.fetch_many(symbols, method='daily_prices', columns=columns)
@@ -0,0 +1,470 @@
+import asyncio
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import FmpConnector as fmp
+
+
+class FakeResponse():
+
+    def __init__(self, payload, status_code=200):
+
+        self.content=json.dumps(payload).encode()
+        self.status_code=status_code
+        self.ok=status_code<400
+        self.text=self.content.decode()
+        self.raw=io.BytesIO(self.content)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        pass
+
+
+class FakeSession():
+
+    '''
+    Stands in for requests.Session, returns payloads by endpoint path and counts requests.
+    Payload can also be (status_code, payload) tuple or exception to raise
+    '''
+
+    def __init__(self, payloads):
+
+        self.payloads=payloads
+        self.calls=[]
+
+    def get(self, endpoint, timeout=None, stream=False):
+
+        self.calls.append(endpoint)
+        path=endpoint.split('/api', 1)[1].split('?')[0]
+        payload=self.payloads[path]
+        if isinstance(payload, Exception):
+            raise payload
+        if isinstance(payload, tuple):
+            return FakeResponse(payload[1], status_code=payload[0])
+        return FakeResponse(payload)
+
+
+def make_connector(payloads, cache=False):
+
+    connector=fmp.FmpConnector('secret123', cache=cache)
+    connector.session=FakeSession(payloads)
+    return connector
+
+
+def stream(payload, prefix, columns=None):
+
+    return fmp._stream_columns(io.BytesIO(json.dumps(payload).encode()), prefix, columns)
+
+
+def test_stream_columns_pads_sparse_records_with_column_filter():
+
+    records=[{'date':'2020-01-01', 'a':1, 'b':2.5},
+             {'date':'2020-01-02', 'a':2, 'x':'skipped'}]
+    values=stream(records, 'item', columns=['date', 'a', 'b'])
+
+    assert {key:len(value) for key, value in values.items()}=={'date':2, 'a':2, 'b':2}
+    df=pd.DataFrame(values)
+    assert df['a'].dtype=='int64'
+    assert np.isnan(df['b'][1])
+
+
+def test_get_daily_prices_sparse_records_with_column_filter():
+
+    historical=[{'date':'2020-01-02', 'close':2.0, 'volume':10},
+                {'date':'2020-01-01', 'close':1.0, 'vwap':1.5}]
+    connector=make_connector({'/v3/historical-price-full/AAPL':{'symbol':'AAPL', 'historical':historical}})
+
+    df=connector.get_daily_prices('AAPL', columns=['close', 'volume'])
+
+    assert list(df.columns)==['close', 'volume']
+    assert list(df['close'])==[1.0, 2.0]
+    assert df.attrs['instrument']=='AAPL'
+
+
+@pytest.mark.parametrize('use_ijson', [True, False])
+def test_repeated_calls_are_served_from_memory(monkeypatch, use_ijson):
+
+    if not use_ijson:
+        monkeypatch.setattr(fmp, 'ijson', None)
+    historical=[{'date':'2020-01-01', 'close':1.0}]
+    connector=make_connector({'/v3/historical-price-full/AAPL':{'symbol':'AAPL', 'historical':historical},
+                              '/v3/profile/AAPL':[{'symbol':'AAPL'}]})
+
+    for _ in range(2):
+        connector.get_daily_prices('AAPL')
+        connector.get_company_info('AAPL')
+    assert len(connector.session.calls)==2
+
+    connector.get_daily_prices('AAPL', force_refresh=True)
+    assert len(connector.session.calls)==3
+
+
+def test_file_cache_concurrent_writes_of_same_url(tmp_path):
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache=fmp.FileCache(dir=str(tmp_path))
+    url=fmp._build_url('daily_prices', symbol='AAPL')
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: cache.set(url, [{'i':i}]), range(32)))
+
+    assert cache.get(url)[0]['i'] in range(32)
+    assert [name for name in tmp_path.iterdir() if name.suffix=='.tmp']==[]
+
+
+def test_file_cache_write_failure_is_logged_not_raised(tmp_path, monkeypatch, caplog):
+
+    cache=fmp.FileCache(dir=str(tmp_path))
+    monkeypatch.setattr(cache, 'dir', str(tmp_path/'missing'))
+    url=fmp._build_url('daily_prices', symbol='AAPL')
+
+    cache.set(url, [{'close':1.0}])
+
+    assert cache.get(url) is None
+    assert 'could not write cache entry' in caplog.text
+
+
+@pytest.mark.parametrize('use_ijson', [True, False])
+def test_empty_daily_prices_are_logged_and_not_cached(tmp_path, monkeypatch, caplog, use_ijson):
+
+    if not use_ijson:
+        monkeypatch.setattr(fmp, 'ijson', None)
+    connector=make_connector({'/v3/historical-price-full/UNKNOWN':{}}, cache=fmp.FileCache(dir=str(tmp_path)))
+
+    for _ in range(2):
+        df=connector.get_daily_prices('UNKNOWN')
+        assert df.empty
+
+    assert len(connector.session.calls)==2
+    assert list(tmp_path.iterdir())==[]
+    assert caplog.text.count('unexpected response')==2
+
+
+def test_full_statement_dtypes_match_between_streamed_and_decoded_paths():
+
+    records=[{'date':'2020', 'a':1, 'b':1.5, 'c':None, 'e':None},
+             {'date':'2021', 'a':2, 'b':None, 'c':3, 'd':7, 'e':None}]
+    streamed=pd.DataFrame(stream(records, 'item'))
+    decoded=fmp._financial_data_df(records, 'full_statement')
+
+    pd.testing.assert_frame_equal(streamed, decoded)
+    assert decoded['d'].dtype=='float64'
+    assert decoded['c'].dtype=='float64'
+    assert decoded['a'].dtype=='int64'
+    assert list(decoded['e'])==[None, None]
+
+
+@pytest.mark.parametrize('dates, expected', [(['2024-01-03', '2024-01-02'], ['2024-01-03', '2024-01-02']),
+                                             (['2024-01-02 16:00:00', '2024-01-03 16:00:00'], ['2024-01-02 16:00', '2024-01-03 16:00'])])
+def test_parse_dates_keeps_time_and_returns_ns(dates, expected):
+
+    parsed=fmp._parse_dates(np.array(dates, dtype=object))
+
+    assert parsed.dtype=='datetime64[ns]'
+    assert list(parsed)==list(pd.to_datetime(expected))
+
+
+def test_error_status_is_logged_and_raised(caplog):
+
+    connector=make_connector({'/v4/historical/social-sentiment':(403, {'Error Message':'Invalid API KEY'})})
+
+    with pytest.raises(fmp.FmpError, match='status 403'):
+        connector.get_sentiment('AAPL')
+    assert 'Invalid API KEY' in caplog.text
+
+
+def test_connection_error_is_logged_and_raised_with_masked_apikey(caplog):
+
+    error=fmp.requests.ConnectionError('Max retries exceeded with url: /api/v3/stock/list?apikey=secret123')
+    connector=make_connector({'/v3/stock/list':error})
+
+    with pytest.raises(fmp.FmpError) as raised:
+        connector.get_instruments('stock')
+    assert 'apikey=***' in str(raised.value)
+    assert 'apikey=***' in caplog.text
+    assert 'secret123' not in caplog.text
+
+
+@pytest.mark.parametrize('payload, expected', [([{'symbol':'AAPL'}], True),
+                                               ((401, {'Error Message':'Invalid API KEY'}), False)])
+def test_connected_is_checked_once_on_first_access(caplog, payload, expected):
+
+    connector=make_connector({'/v3/profile/AAPL':payload})
+    assert connector.session.calls==[]
+
+    assert connector.connected is expected
+    assert connector.connected is expected
+    assert len(connector.session.calls)==1
+    assert ('apikey check failed' in caplog.text) is (not expected)
+
+
+def test_connected_raises_on_connection_error():
+
+    connector=make_connector({'/v3/profile/AAPL':fmp.requests.ConnectionError('connection refused')})
+
+    with pytest.raises(fmp.FmpError, match='connection refused'):
+        connector.connected
+
+
+def test_invalid_option_is_logged_and_returns_empty_frame(caplog):
+
+    connector=make_connector({})
+
+    df=connector.get_company_info('AAPL', info_type='unknown')
+
+    assert df.empty
+    assert connector.session.calls==[]
+    assert "'unknown' is not valid info_type" in caplog.text
+
+
+def test_company_profile_is_built_without_transpose():
+
+    connector=make_connector({'/v3/profile/AAPL':[{'symbol':'AAPL', 'price':1.5}]})
+
+    df=connector.get_company_info('AAPL')
+
+    assert list(df.index)==['symbol', 'price']
+    assert df.index.name=='field'
+    assert list(df['info'])==['AAPL', 1.5]
+
+
+@pytest.mark.parametrize('use_ijson', [True, False])
+def test_file_cache_serves_new_connector(tmp_path, monkeypatch, use_ijson):
+
+    if not use_ijson:
+        monkeypatch.setattr(fmp, 'ijson', None)
+    payloads={'/v3/historical-price-full/AAPL':{'symbol':'AAPL', 'historical':[{'date':'2020-01-01', 'close':1.0}]},
+              '/v3/financial-statement-full-as-reported/AAPL':[{'date':'2020', 'revenue':10}]}
+
+    first=make_connector(payloads, cache=fmp.FileCache(dir=str(tmp_path)))
+    expected_prices=first.get_daily_prices('AAPL')
+    expected_statement=first.get_financial_data('AAPL', report_type='full_statement')
+
+    second=make_connector(payloads, cache=fmp.FileCache(dir=str(tmp_path)))
+    pd.testing.assert_frame_equal(second.get_daily_prices('AAPL'), expected_prices)
+    pd.testing.assert_frame_equal(second.get_financial_data('AAPL', report_type='full_statement'), expected_statement)
+    assert second.session.calls==[]
+
+
+@pytest.mark.parametrize('use_ijson', [True, False])
+def test_file_cache_hits_are_promoted_to_memory(tmp_path, monkeypatch, use_ijson):
+
+    if not use_ijson:
+        monkeypatch.setattr(fmp, 'ijson', None)
+    payloads={'/v3/historical-price-full/AAPL':{'symbol':'AAPL', 'historical':[{'date':'2020-01-01', 'close':1.0}]},
+              '/v3/profile/AAPL':[{'symbol':'AAPL'}]}
+    make_connector(payloads, cache=fmp.FileCache(dir=str(tmp_path))).get_daily_prices('AAPL')
+    make_connector(payloads, cache=fmp.FileCache(dir=str(tmp_path))).get_company_info('AAPL')
+
+    cache=fmp.FileCache(dir=str(tmp_path))
+    reads=[]
+    original_get=cache.get
+    monkeypatch.setattr(cache, 'get', lambda url: reads.append(url) or original_get(url))
+    connector=make_connector(payloads, cache=cache)
+    for _ in range(3):
+        connector.get_daily_prices('AAPL')
+        connector.get_company_info('AAPL')
+
+    assert len(reads)==2
+    assert connector.session.calls==[]
+
+
+@pytest.mark.parametrize('no_ttl_cache, memory_cache', [(True, True), (False, False)])
+def test_memory_cache_follows_file_cache_ttl_and_can_be_disabled(tmp_path, no_ttl_cache, memory_cache):
+
+    cache=fmp.FileCache(dir=str(tmp_path), ttl={}) if no_ttl_cache else False
+    connector=fmp.FmpConnector('secret123', cache=cache, memory_cache=memory_cache)
+    connector.session=FakeSession({'/v3/historical-price-full/AAPL':{'historical':[{'date':'2020-01-01', 'close':1.0}]},
+                                   '/v3/profile/AAPL':[{'symbol':'AAPL'}]})
+
+    for _ in range(2):
+        connector.get_daily_prices('AAPL')
+        connector.get_company_info('AAPL')
+
+    assert len(connector.session.calls)==4
+
+
+def test_get_all_statements_uses_cache_for_known_statements():
+
+    payloads={'/v3/balance-sheet-statement/AAPL':[{'date':'2020', 'totalAssets':1}],
+              '/v3/income-statement/AAPL':[{'date':'2020', 'revenue':2}],
+              '/v3/cash-flow-statement/AAPL':[{'date':'2020', 'freeCashFlow':3}]}
+    connector=make_connector(payloads)
+    connector.get_financial_data('AAPL', report_type='income_statement')
+
+    statements=connector.get_all_statements('AAPL')
+
+    assert list(statements)==['balance', 'income', 'cashflow']
+    assert statements['income']['revenue'][0]==2
+    assert len(connector.session.calls)==3
+
+
+def test_get_instruments_returns_copy_of_memoized_frame():
+
+    connector=make_connector({'/v3/stock/list':[{'symbol':'AAPL'}]})
+
+    instruments=connector.get_instruments('stock')
+    instruments['symbol']='changed'
+
+    assert list(connector.get_instruments('stock')['symbol'])==['AAPL']
+    assert len(connector.session.calls)==1
+
+
+def test_async_profiles_are_batched_and_failures_returned():
+
+    calls=[]
+
+    async def fetch(endpoint):
+        calls.append(endpoint)
+        if 'historical-price-full/BAD' in endpoint:
+            raise fmp.FmpError('failed')
+        if '/profile/' in endpoint:
+            return [{'symbol':symbol, 'price':1} for symbol in endpoint.rsplit('/', 1)[1].split(',')]
+        return {'historical':[{'date':'2020-01-01', 'close':1.0}]}
+
+    async def run():
+        async with fmp.FmpAsyncConnector('secret123') as connector:
+            connector._fetch=fetch
+            connector._profile_batcher.fetch=fetch
+            profiles=await connector.fetch_many(['AAPL', 'MSFT'], method='company_info')
+            prices=await connector.get_daily_prices_many(['AAPL', 'BAD'])
+        return profiles, prices
+
+    profiles, prices=asyncio.run(run())
+
+    assert {symbol:df.loc['symbol', 'info'] for symbol, df in profiles.items()}=={'AAPL':'AAPL', 'MSFT':'MSFT'}
+    assert sum('/profile/' in endpoint for endpoint in calls)==1
+    assert list(prices['AAPL']['close'])==[1.0]
+    assert isinstance(prices['BAD'], fmp.FmpError)
+
+
+def test_draw_chart_updates_passed_figure_in_place():
+
+    index=pd.date_range('2024-01-01', periods=10, freq='B', name='date')
+    df=pd.DataFrame({'open':np.arange(10.0), 'high':np.arange(10.0)+2, 'low':np.arange(10.0)-1,
+                     'close':np.arange(10.0)+1, 'volume':np.arange(10)*100}, index=index)
+    df.attrs={'instrument':'AAPL', 'interval':'1day'}
+    connector=make_connector({})
+
+    figure=connector.draw_chart(df, chart_type='candle')
+    assert [trace.type for trace in figure.data]==['bar', 'candlestick']
+
+    for chart_type, trace_type in [('line', 'scatter'), ('ohlc', 'ohlc'), ('candle', 'candlestick')]:
+        redrawn=connector.draw_chart(df, start='2024-01-03', end='2024-01-10', chart_type=chart_type, figure=figure)
+
+        assert redrawn is figure
+        assert [trace.type for trace in figure.data]==['bar', trace_type]
+        assert figure.data[0].yaxis=='y2'
+        assert figure.data[1].yaxis=='y'
+        assert len(figure.data[0].x)==len(figure.data[1].x)==6
+        assert f'CHART TYPE: {chart_type} ' in figure.layout.title.text
+        assert 'START: 2024-01-03' in figure.layout.title.text
+
+
+class FakeAsyncResponse():
+
+    def __init__(self, payload, status=200):
+
+        self.content=json.dumps(payload).encode()
+        self.status=status
+        self.headers={}
+
+    async def __aenter__(self):
+
+        return self
+
+    async def __aexit__(self, *exc_info):
+
+        pass
+
+    async def read(self):
+
+        return self.content
+
+    async def text(self):
+
+        return self.content.decode()
+
+
+class FakeAsyncSession():
+
+    '''
+    Stands in for aiohttp.ClientSession, returns given responses in order, exceptions are raised
+    '''
+
+    def __init__(self, responses):
+
+        self.responses=list(responses)
+        self.calls=[]
+        self.closed=False
+
+    def get(self, endpoint, params=None):
+
+        self.calls.append(endpoint)
+        response=self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def close(self):
+
+        self.closed=True
+
+
+@pytest.mark.parametrize('retry_total, failures, succeeds', [(2, 2, True), (1, 2, False)])
+def test_async_connection_errors_are_retried(caplog, retry_total, failures, succeeds):
+
+    error=fmp.aiohttp.ClientConnectionError('connection reset, apikey=secret123')
+    session=FakeAsyncSession([error]*failures+[FakeAsyncResponse([{'symbol':'AAPL'}])])
+
+    async def run():
+        connector=fmp.FmpAsyncConnector('secret123', retry_total=retry_total, retry_backoff=0)
+        connector._session=session
+        return await connector._fetch('https://example.com/api/v3/profile/AAPL')
+
+    if succeeds:
+        assert asyncio.run(run())==[{'symbol':'AAPL'}]
+    else:
+        with pytest.raises(fmp.FmpError, match='apikey=\\*\\*\\*'):
+            asyncio.run(run())
+        assert 'secret123' not in caplog.text
+    assert len(session.calls)==min(failures+1, retry_total+1)
+
+
+def test_async_connector_is_reusable_across_event_loops(monkeypatch):
+
+    from aiohttp import web
+
+    async def handler(request):
+        symbol=request.match_info['symbol']
+        if request.path.startswith('/api/v3/profile/'):
+            return web.json_response([{'symbol':symbol} for symbol in symbol.split(',')])
+        return web.json_response({'symbol':symbol, 'historical':[{'date':'2020-01-01', 'close':1.0}]})
+
+    async def run(connector, method):
+        app=web.Application()
+        app.router.add_get('/api/v3/{endpoint}/{symbol}', handler)
+        runner=web.AppRunner(app)
+        await runner.setup()
+        site=web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        monkeypatch.setattr(fmp, 'BASE_URL', f'http://127.0.0.1:{runner.addresses[0][1]}/api')
+        try:
+            return await connector.fetch_many(['AAPL', 'MSFT', 'GOOG'], method=method)
+        finally:
+            await runner.cleanup()
+
+    # concurrency below number of symbols makes requests wait on semaphore
+    connector=fmp.FmpAsyncConnector('secret123', concurrency=1)
+    for method in ['daily_prices', 'daily_prices', 'company_info']:
+        results=asyncio.run(run(connector, method))
+        assert not [result for result in results.values() if isinstance(result, Exception)]
+    asyncio.run(connector.close())